@@ -108,7 +108,7 @@ class Inference(BaseInference):
 
         if device is None:
             device = self.model.device
-        self.device = device
+        self.device = torch.device(device)
 
         self.model.eval()
         self.model.to(self.device)
@@ -210,9 +210,14 @@ class Inference(BaseInference):
             Model output.
         """
 
+        # copy chunks into (per-call) pinned memory so that they can be
+        # sent asynchronously to the GPU
+        if self.device.type == "cuda" and not chunks.is_cuda:
+            chunks = chunks.pin_memory()
+
         with torch.inference_mode():
             try:
-                outputs = self.model(chunks.to(self.device))
+                outputs = self.model(chunks.to(self.device, non_blocking=True))
             except RuntimeError as exception:
                 if is_oom_error(exception):
                     raise MemoryError(
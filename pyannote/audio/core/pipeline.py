@@ -20,22 +20,38 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import io
+import json
 import os
+import tempfile
 import warnings
 from collections import OrderedDict
 from collections.abc import Iterator
-from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
 from pathlib import Path
-from typing import Callable, Dict, List, Optional, Text, Union
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Text,
+    Tuple,
+    Union,
+)
 
 import torch
 import torch.nn as nn
 import yaml
-from huggingface_hub import hf_hub_download
-from huggingface_hub.utils import RepositoryNotFoundError
 from pyannote.core.utils.helper import get_class_by_name
 from pyannote.database import FileFinder, ProtocolFile
 from pyannote.pipeline import Pipeline as _Pipeline
+from torch import Tensor
+from torch.utils.data import DataLoader, Dataset
+from torchaudio.transforms import Resample
 
 from pyannote.audio import Audio, __version__
 from pyannote.audio.core.inference import BaseInference
@@ -44,9 +60,185 @@ from pyannote.audio.core.model import CACHE_DIR, Model
 from pyannote.audio.utils.reproducibility import fix_reproducibility
 from pyannote.audio.utils.version import check_version
 
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:
+    from yaml import SafeLoader as _Loader
+
 PIPELINE_PARAMS_NAME = "config.yaml"
 
+_CPU_DEVICE = torch.device("cpu")
+
+# class lookup is deterministic: no need to walk modules again on every call
+_get_class_by_name = lru_cache(maxsize=256)(get_class_by_name)
+
+
+def _load_config(config_yml: Text) -> Dict:
+    """Load pipeline configuration file
+
+    When PYANNOTE_CONFIG_CACHE=1, parsed configuration is also dumped to a
+    "<config_yml>.cache.json" sidecar file that is reused (instead of parsing
+    YAML again) as long as it is not older than `config_yml`.
+    """
+
+    use_cache = os.getenv("PYANNOTE_CONFIG_CACHE", "0") == "1"
+    cache = f"{config_yml}.cache.json"
+
+    if (
+        use_cache
+        and os.path.isfile(cache)
+        and os.path.getmtime(cache) >= os.path.getmtime(config_yml)
+    ):
+        try:
+            with open(cache, "r") as fp:
+                return json.load(fp)
+        except (OSError, ValueError):
+            pass
+
+    with open(config_yml, "r") as fp:
+        config = yaml.load(fp, Loader=_Loader)
+
+    if use_cache:
+        _dump_config_cache(config, cache)
+
+    return config
+
+
+def _dump_config_cache(config: Dict, cache: Text):
+    """Write JSON sidecar of parsed configuration (best effort)
+
+    Nothing is written when JSON cannot represent `config` exactly (e.g.
+    integer keys or dates). File is written atomically so that concurrent
+    processes never read a partial sidecar.
+    """
+
+    try:
+        content = json.dumps(config)
+    except (TypeError, ValueError):
+        return
+
+    if json.loads(content) != config:
+        return
+
+    try:
+        fd, tmp = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(cache)), suffix=".tmp"
+        )
+    except OSError:
+        return
+
+    try:
+        with os.fdopen(fd, "w") as fp:
+            fp.write(content)
+        os.replace(tmp, cache)
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+def _load_preprocessor(item: Tuple[Text, Union[Text, Dict]]) -> Tuple[Text, Any]:
+    """Load preprocessor from its `config.yaml` entry
+
+    Parameters
+    ----------
+    item : (key, preprocessor) tuple
+        `preprocessor` is either a {"name": ..., "params": ...} dictionary,
+        the path to a database.yml file, None (for FileFinder's default
+        database.yml files), or a path template.
+
+    Returns
+    -------
+    key : str
+        Same as input.
+    preprocessor :
+        Instantiated preprocessor (or template, as is).
+    """
+
+    key, preprocessor = item
+
+    if isinstance(preprocessor, dict):
+        Klass = _get_class_by_name(preprocessor["name"], default_module_name="pyannote.audio")
+        params = preprocessor.get("params", {})
+        return key, Klass(**params)
+
+    # None stands for FileFinder's default database.yml registry
+    if preprocessor is None or (
+        isinstance(preprocessor, str)
+        and preprocessor.endswith((".yml", ".yaml"))
+        and os.path.isfile(os.path.expanduser(preprocessor))
+    ):
+        try:
+            return key, FileFinder(database_yml=preprocessor)
+        except FileNotFoundError:
+            pass
+
+    template = preprocessor
+    return key, template
+
+
+def _as_audio_file(file: Union[AudioFile, bytes, bytearray]) -> AudioFile:
+    """Wrap raw bytes into a file-like object and rewind file-like objects"""
+
+    if isinstance(file, (bytes, bytearray)):
+        file = io.BytesIO(file)
+    if isinstance(file, io.IOBase) and file.seekable():
+        file.seek(0)
+    return file
+
+
+def _load_waveform(
+    file: Mapping, sample_rate: Optional[int] = None
+) -> Tuple[Tensor, int]:
+    """Load (and resample) whole waveform of a validated file
+
+    Channel selection is left to downstream `Audio` calls so that the
+    file "channel" key remains valid once the waveform is stored in it.
+    Multi-channel audio is therefore only downmixed when no channel is
+    selected.
+    """
+
+    # only read "audio" key: copying a whole ProtocolFile would
+    # evaluate all its lazy keys
+    mono = None if "channel" in file else "downmix"
+    waveform, file_sample_rate = Audio(mono=mono)({"audio": file["audio"]})
+    return Pipeline._resample(waveform, file_sample_rate, sample_rate)
+
+
+def _identity(item):
+    return item
+
+
+class _AudioFileDataset(Dataset):
+    """Map-style dataset loading (and resampling) whole audio files
+
+    Used by `Pipeline.apply_batch` to load audio files in background workers.
+    """
+
+    def __init__(self, files: List[AudioFile], sample_rate: Optional[int] = None):
+        super().__init__()
+        self.files = files
+        self.sample_rate = sample_rate
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def __getitem__(self, idx: int) -> Dict:
+        file = Audio.validate_file(_as_audio_file(self.files[idx]))
+        if "waveform" in file:
+            # nothing to load
+            return dict()
+
+        waveform, sample_rate = _load_waveform(file, self.sample_rate)
+        return {"waveform": waveform, "sample_rate": sample_rate}
+
+
 class Pipeline(_Pipeline):
+    # resampling modules shared by all pipelines, indexed by
+    # (original sample rate, target sample rate)
+    _resampler_cache: Dict[Tuple[int, int], Resample] = {}
+
     @classmethod
     def from_pretrained(cls, checkpoint_path: Union[Text, Path], hparams_file: Union[Text, Path] = None, cache_dir: Union[Path, Text] = CACHE_DIR) -> "Pipeline":
         """Load pretrained pipeline from a local path
@@ -66,13 +258,11 @@ class Pipeline(_Pipeline):
         checkpoint_path = str(checkpoint_path)
         if not os.path.isfile(checkpoint_path):
             raise FileNotFoundError(f"Checkpoint file not found: {checkpoint_path}")
-        config_yml = checkpoint_path
-        with open(config_yml, "r") as fp:
-            config = yaml.load(fp, Loader=yaml.SafeLoader)
+        config = _load_config(checkpoint_path)
         if "version" in config:
             check_version("pyannote.audio", config["version"], __version__, what="Pipeline")
         pipeline_name = config["pipeline"]["name"]
-        Klass = get_class_by_name(pipeline_name, default_module_name="pyannote.pipeline.blocks")
+        Klass = _get_class_by_name(pipeline_name, default_module_name="pyannote.pipeline.blocks")
         params = config["pipeline"].get("params", {})
         pipeline = Klass(**params)
         if "freeze" in config:
@@ -81,27 +271,31 @@ class Pipeline(_Pipeline):
         if "params" in config:
             pipeline.instantiate(config["params"])
         if hparams_file is not None:
-            pipeline.load_params(hparams_file)
+            # parse hyper-parameters file here (with the faster YAML loader)
+            # unless the pipeline comes with its own way of loading it
+            if type(pipeline).load_params is _Pipeline.load_params:
+                with open(hparams_file, "r") as fp:
+                    pipeline.load_params_dict(yaml.load(fp, Loader=_Loader))
+            else:
+                pipeline.load_params(hparams_file)
         if "preprocessors" in config:
-            preprocessors = {}
-            for key, preprocessor in config.get("preprocessors", {}).items():
-                if isinstance(preprocessor, dict):
-                    Klass = get_class_by_name(preprocessor["name"], default_module_name="pyannote.audio")
-                    params = preprocessor.get("params", {})
-                    preprocessors[key] = Klass(**params)
-                else:
-                    try:
-                        preprocessors[key] = FileFinder(database_yml=preprocessor)
-                    except FileNotFoundError:
-                        template = preprocessor
-                        preprocessors[key] = template
+            items = list(config.get("preprocessors", {}).items())
+            if items:
+                # preprocessors are loaded concurrently as most of them
+                # spend their time reading (database.yml) files
+                with ThreadPoolExecutor(max_workers=min(8, len(items))) as executor:
+                    preprocessors = dict(executor.map(_load_preprocessor, items))
+            else:
+                preprocessors = {}
             pipeline.preprocessors = preprocessors
         if "device" in config:
             device = torch.device(config["device"])
-            try:
-                pipeline.to(device)
-            except RuntimeError as e:
-                print(e)
+            # pipelines are built on CPU: no need to move them there again
+            if device != getattr(pipeline, "device", _CPU_DEVICE):
+                try:
+                    pipeline.to(device)
+                except RuntimeError as e:
+                    print(e)
         return pipeline
 
     def __init__(self):
@@ -109,18 +303,38 @@ class Pipeline(_Pipeline):
         self._models: Dict[str, Model] = OrderedDict()
         self._inferences: Dict[str, BaseInference] = OrderedDict()
 
+    def load_params_dict(self, params: Dict) -> "Pipeline":
+        """Instantiate pipeline from already parsed hyper-parameters file
+
+        Parameters
+        ----------
+        params : dict
+            Content of hyper-parameters file, as written by `dump_params`
+            (i.e. with hyper-parameters under the "params" key).
+
+        Returns
+        -------
+        pipeline : Pipeline
+            Instantiated pipeline.
+        """
+        return self.instantiate(params["params"])
+
     def __getattr__(self, name):
-        if "_models" in self.__dict__:
-            _models = self.__dict__["_models"]
-            if name in _models:
-                return _models[name]
-        if "_inferences" in self.__dict__:
-            _inferences = self.__dict__["_inferences"]
-            if name in _inferences:
-                return _inferences[name]
+        try:
+            return object.__getattribute__(self, "_models")[name]
+        except (AttributeError, KeyError):
+            pass
+        try:
+            return object.__getattribute__(self, "_inferences")[name]
+        except (AttributeError, KeyError):
+            pass
         return super().__getattr__(name)
 
     def __setattr__(self, name, value):
+        # fast path for anything that is neither a model nor an inference
+        if not isinstance(value, (nn.Module, BaseInference)):
+            return super().__setattr__(name, value)
+
         def remove_from(*dicts):
             for d in dicts:
                 if name in d:
@@ -136,14 +350,12 @@ class Pipeline(_Pipeline):
                 raise AttributeError(msg)
             remove_from(self.__dict__, _inferences, _parameters, _instantiated, _pipelines)
             _models[name] = value
-        elif isinstance(value, BaseInference):
+        else:
             if _inferences is None:
                 msg = "cannot assign inferences before Pipeline.__init__() call"
                 raise AttributeError(msg)
             remove_from(self.__dict__, _models, _parameters, _instantiated, _pipelines)
             _inferences[name] = value
-        else:
-            super().__setattr__(name, value)
 
     def __delattr__(self, name):
         if name in self._models:
@@ -165,8 +377,134 @@ class Pipeline(_Pipeline):
     def classes(self) -> Union[List, Iterator]:
         raise NotImplementedError()
 
-    def __call__(self, file: AudioFile, **kwargs):
-        fix_reproducibility(getattr(self, "device", torch.device("cpu")))
+    def _cached_forward(self, key: Text, file: AudioFile, fn: Callable):
+        """Compute `fn()` once per file while optimizing hyper-parameters
+
+        When pipeline is in training mode, output of `fn()` is stored in
+        `file[key]` and reused by subsequent calls on the same file.
+
+        Parameters
+        ----------
+        key : str
+            Key used to store output in `file`.
+        file : AudioFile
+            Processed file.
+        fn : callable
+            Function called (without any argument) on cache miss.
+        """
+
+        if not self.training:
+            return fn()
+
+        if key not in file:
+            file[key] = fn()
+        return file[key]
+
+    @classmethod
+    def _resample(
+        cls, waveform: Tensor, sample_rate: int, target_sample_rate: Optional[int]
+    ) -> Tuple[Tensor, int]:
+        """Resample waveform to `target_sample_rate` (if not None)
+
+        Resampling modules are cached per (sample_rate, target_sample_rate)
+        pair so that their kernel is only computed once.
+        """
+
+        if target_sample_rate is None or target_sample_rate == sample_rate:
+            return waveform, sample_rate
+
+        key = (sample_rate, target_sample_rate)
+        resample = cls._resampler_cache.get(key)
+        if resample is None:
+            resample = cls._resampler_cache.setdefault(
+                key, Resample(sample_rate, target_sample_rate)
+            )
+        return resample(waveform), target_sample_rate
+
+    def _preload_sample_rate(self) -> Optional[int]:
+        """Sample rate used when preloading audio files
+
+        `self.sample_rate` when the pipeline defines it, or sample rate of its
+        first model. None (i.e. keep native sample rate) otherwise.
+        """
+
+        sample_rate = getattr(self, "sample_rate", None)
+        if sample_rate is None:
+            models = list(self._models.values()) + [
+                getattr(inference, "model", None)
+                for inference in self._inferences.values()
+            ]
+            for model in models:
+                if isinstance(model, Model):
+                    sample_rate = model.audio.sample_rate
+                    break
+        return sample_rate
+
+    def _preload(self, file: Mapping) -> Mapping:
+        """Load (and resample) whole audio file once
+
+        Saves downstream `Audio.crop` calls from decoding the same file over
+        and over again.
+        """
+
+        waveform, sample_rate = _load_waveform(file, self._preload_sample_rate())
+        return self._with_waveform(file, waveform, sample_rate)
+
+    def _with_waveform(
+        self, file: Mapping, waveform: Tensor, sample_rate: int
+    ) -> Mapping:
+        """Add (already loaded) waveform to file
+
+        Parameters
+        ----------
+        file : Mapping
+            Validated file.
+        waveform : (channel, time) Tensor
+            Whole waveform of `file` (i.e. before channel selection).
+        sample_rate : int
+            Sample rate of `waveform`.
+        """
+
+        # do not modify caller's file in place, unless in training mode
+        # where cached outputs must be stored in caller's file to be reused
+        # by next trials (waveform is removed from it by the caller once
+        # the pipeline has been applied, see `_release_waveform`)
+        if not self.training:
+            if isinstance(file, ProtocolFile):
+                # keeps lazy keys lazy
+                file = ProtocolFile(file)
+            else:
+                file = dict(file)
+        file["waveform"] = waveform
+        file["sample_rate"] = sample_rate
+        return file
+
+    def _release_waveform(self, file: Mapping):
+        """Remove preloaded waveform from caller's file in training mode
+
+        Keeping decoded audio of every file for the whole optimization
+        would be a waste of memory as model outputs are cached anyway.
+        """
+
+        if self.training:
+            del file["waveform"]
+            del file["sample_rate"]
+
+    def _needs_preload(self, file: Mapping) -> bool:
+        if "waveform" in file:
+            return False
+
+        # no need to decode audio again when segmentation is already cached
+        if self.training:
+            cached_segmentation = getattr(self, "CACHED_SEGMENTATION", None)
+            if cached_segmentation is not None and cached_segmentation in file:
+                return False
+
+        return True
+
+    def __call__(self, file: AudioFile, preload: bool = True, **kwargs):
+        device = getattr(self, "device", _CPU_DEVICE)
+        fix_reproducibility(device)
         if not self.instantiated:
             try:
                 default_parameters = self.default_parameters()
@@ -177,20 +515,86 @@ class Pipeline(_Pipeline):
             except ValueError:
                 raise RuntimeError("A pipeline must be instantiated with `pipeline.instantiate(parameters)` before it can be applied.")
             warnings.warn(f"The pipeline has been automatically instantiated with {default_parameters}.")
-        file = Audio.validate_file(file)
+        file = Audio.validate_file(_as_audio_file(file))
+        preloaded = preload and self._needs_preload(file)
+        if preloaded:
+            file = preloaded_file = self._preload(file)
         if hasattr(self, "preprocessors"):
             file = ProtocolFile(file, lazy=self.preprocessors)
-        return self.apply(file, **kwargs)
+        try:
+            return self.apply(file, **kwargs)
+        finally:
+            if preloaded:
+                self._release_waveform(preloaded_file)
+
+    def apply_batch(
+        self, files: Iterable[AudioFile], num_workers: int = 4, **kwargs
+    ) -> Iterator:
+        """Apply pipeline on multiple files
+
+        Audio files are loaded (and resampled) by `num_workers` background
+        workers while the pipeline processes the current file.
+
+        Parameters
+        ----------
+        files : iterable of AudioFile
+            Files to process. File-like objects are not supported when
+            `num_workers` > 0 as they cannot be sent to workers.
+        num_workers : int, optional
+            Number of workers used to load audio files. Defaults to 4.
+            Use 0 to load them in the main process.
+        kwargs :
+            Passed to the pipeline (e.g. `hook`).
+
+        Yields
+        ------
+        output :
+            Output of the pipeline for each file, in order.
+        """
+
+        device = getattr(self, "device", _CPU_DEVICE)
+        dataset = _AudioFileDataset(list(files), self._preload_sample_rate())
+        loader = DataLoader(
+            dataset,
+            batch_size=None,
+            num_workers=num_workers,
+            pin_memory=device.type == "cuda",
+            prefetch_factor=2 if num_workers > 0 else None,
+            collate_fn=_identity,
+        )
+        for file, loaded in zip(dataset.files, loader):
+            file = Audio.validate_file(_as_audio_file(file))
+            if "waveform" in file:
+                yield self(file, preload=False, **kwargs)
+                continue
+
+            file = self._with_waveform(
+                file, loaded["waveform"], loaded["sample_rate"]
+            )
+            try:
+                output = self(file, preload=False, **kwargs)
+            finally:
+                self._release_waveform(file)
+            yield output
 
     def to(self, device: torch.device):
         if not isinstance(device, torch.device):
             raise TypeError(f"`device` must be an instance of `torch.device`, got `{type(device).__name__}`")
+        if device.type == "cuda":
+            # issue host-to-device copies without waiting for each of them
+            # and wait for all of them once at the end
+            self._to(device, non_blocking=True)
+            torch.cuda.current_stream(device).synchronize()
+        else:
+            self._to(device)
+        self.device = device
+        return self
+
+    def _to(self, device: torch.device, non_blocking: bool = False):
         for _, pipeline in self._pipelines.items():
             if hasattr(pipeline, "to"):
                 _ = pipeline.to(device)
         for _, model in self._models.items():
-            _ = model.to(device)
+            _ = model.to(device, non_blocking=non_blocking)
         for _, inference in self._inferences.items():
             _ = inference.to(device)
-        self.device = device
-        return self
@@ -179,18 +179,13 @@ class MultiLabelSegmentation(Pipeline):
 
         # apply segmentation model (only if needed)
         # output shape is (num_chunks, num_frames, num_classes)
-        if self.training:
-            if self.CACHED_SEGMENTATION in file:
-                segmentations = file[self.CACHED_SEGMENTATION]
-            else:
-                segmentations = self._segmentation(
-                    file, hook=partial(hook, "segmentation", None)
-                )
-                file[self.CACHED_SEGMENTATION] = segmentations
-        else:
-            segmentations: SlidingWindowFeature = self._segmentation(
+        segmentations: SlidingWindowFeature = self._cached_forward(
+            self.CACHED_SEGMENTATION,
+            file,
+            lambda: self._segmentation(
                 file, hook=partial(hook, "segmentation", None)
-            )
+            ),
+        )
 
         hook("segmentation", segmentations)
 
@@ -213,14 +213,11 @@ class SpeakerDiarization(SpeakerDiarizationMixin, Pipeline):
         if hook is not None:
             hook = functools.partial(hook, "segmentation", None)
 
-        if self.training:
-            if self.CACHED_SEGMENTATION in file:
-                segmentations = file[self.CACHED_SEGMENTATION]
-            else:
-                segmentations = self._segmentation(file, hook=hook)
-                file[self.CACHED_SEGMENTATION] = segmentations
-        else:
-            segmentations: SlidingWindowFeature = self._segmentation(file, hook=hook)
+        segmentations: SlidingWindowFeature = self._cached_forward(
+            self.CACHED_SEGMENTATION,
+            file,
+            lambda: self._segmentation(file, hook=hook),
+        )
 
         return segmentations
 
@@ -25,6 +25,7 @@ from .getter import (
     PipelineAugmentation,
     PipelineInference,
     PipelineModel,
+    clear_model_cache,
     get_augmentation,
     get_devices,
     get_inference,
@@ -42,4 +43,5 @@ __all__ = [
     "PipelineInference",
     "get_model",
     "PipelineModel",
+    "clear_model_cache",
 ]
@@ -19,18 +19,92 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
-import os
+import copy
+import inspect
 import itertools
-from typing import Mapping, Optional, Text, Union
+import os
+import pickle
+from collections import OrderedDict
+from typing import Any, Mapping, Optional, Text, Tuple, Union
 
 import torch
 from torch_audiomentations.core.transforms_interface import BaseWaveformTransform
-from torch_audiomentations.utils.config import from_dict as augmentation_from_dict
 
 from pyannote.audio import Inference, Model
 
 PipelineModel = Union[Model, Text, Mapping]
 
+# CPU checkpoints loaded by `get_model`, indexed by the real path of their
+# file, along with its modification time. Least recently used checkpoints
+# are evicted once there are more than _MODEL_CACHE_MAXSIZE of them.
+_MODEL_CACHE: "OrderedDict[Text, Tuple[float, Any]]" = OrderedDict()
+_MODEL_CACHE_MAXSIZE = 4
+
+
+def clear_model_cache():
+    """Clear cache of checkpoints loaded by `get_model`
+
+    Needed when a checkpoint file is modified in place without changing its
+    modification time.
+    """
+    _MODEL_CACHE.clear()
+
+
+def _load_checkpoint(path: Text):
+    """Load checkpoint, reusing the one already loaded from the same file
+
+    Callers get their own copy of cached models. State dicts are only
+    copied shallowly so that their (possibly memory-mapped) tensors are
+    shared rather than read into memory again.
+    """
+
+    key = os.path.realpath(path)
+    mtime = os.path.getmtime(path)
+
+    entry = _MODEL_CACHE.get(key)
+    if entry is None or entry[0] != mtime:
+        # (re)load when missing or when file was modified since then
+        entry = _MODEL_CACHE[key] = (mtime, _torch_load(path))
+    _MODEL_CACHE.move_to_end(key)
+
+    while len(_MODEL_CACHE) > _MODEL_CACHE_MAXSIZE:
+        _MODEL_CACHE.popitem(last=False)
+
+    checkpoint = entry[1]
+    if isinstance(checkpoint, torch.nn.Module):
+        return copy.deepcopy(checkpoint)
+    return copy.copy(checkpoint)
+
+
+# older torch versions do not support `mmap` and `weights_only`
+_TORCH_LOAD_MMAP = {"mmap", "weights_only"} <= set(
+    inspect.signature(torch.load).parameters
+)
+
+
+def _torch_load(path: Text):
+    """Load checkpoint on CPU, memory-mapping its storages when possible"""
+
+    if not _TORCH_LOAD_MMAP:
+        return torch.load(path, map_location="cpu")
+
+    try:
+        return _torch_load_weights(path, mmap=True)
+    except RuntimeError as e:
+        # legacy (non-zip) checkpoints cannot be memory-mapped
+        if "mmap" not in str(e):
+            raise e
+        return _torch_load_weights(path, mmap=False)
+
+
+def _torch_load_weights(path: Text, mmap: bool = False):
+    try:
+        return torch.load(path, map_location="cpu", mmap=mmap, weights_only=True)
+    except pickle.UnpicklingError:
+        # checkpoint contains a whole pickled model, not just weights
+        return torch.load(path, map_location="cpu", mmap=mmap, weights_only=False)
+
+
 def get_model(model: Union[str, Mapping]):
     """Load a pretrained model strictly from local files.
 
@@ -43,12 +117,12 @@ def get_model(model: Union[str, Mapping]):
     if isinstance(model, str):
         # Assume model is a direct file path
         if os.path.isfile(model):
-            return torch.load(model)
+            model = _load_checkpoint(model)
         else:
             # Check if the model path might refer to a directory with a 'model.pth' file
             model_path = os.path.join(model, 'model.pth')
             if os.path.isfile(model_path):
-                return torch.load(model_path)
+                model = _load_checkpoint(model_path)
             else:
                 raise FileNotFoundError(f"No model file found at path: {model} or within directory as 'model.pth'")
 
@@ -56,15 +130,15 @@ def get_model(model: Union[str, Mapping]):
         # Handle dictionary input, expecting a 'checkpoint' key for the model path
         checkpoint = model.get("checkpoint")
         if checkpoint and os.path.isfile(checkpoint):
-            return torch.load(checkpoint)
+            model = _load_checkpoint(checkpoint)
         else:
             raise FileNotFoundError(f"No model found at path specified by 'checkpoint': {checkpoint}")
 
     else:
         raise TypeError("Model input must be a string path or a dictionary with a 'checkpoint' key.")
 
-
-    model.eval()
+    if isinstance(model, torch.nn.Module):
+        model.eval()
     return model
 
 
@@ -141,6 +215,10 @@ def get_augmentation(augmentation: PipelineAugmentation) -> BaseWaveformTransfor
         return augmentation
 
     if isinstance(augmentation, Mapping):
+        from torch_audiomentations.utils.config import (
+            from_dict as augmentation_from_dict,
+        )
+
         return augmentation_from_dict(augmentation)
 
     raise TypeError(
@@ -152,6 +230,9 @@ def get_augmentation(augmentation: PipelineAugmentation) -> BaseWaveformTransfor
 def get_devices(needs: Optional[int] = None):
     """Get devices that can be used by the pipeline
 
+    Set PYANNOTE_DEVICE_BALANCE=1 environment variable to sort GPUs by
+    decreasing amount of free memory (instead of by index).
+
     Parameters
     ----------
     needs : int, optional
@@ -172,7 +253,14 @@ def get_devices(needs: Optional[int] = None):
             return devices
         return devices * needs
 
-    devices = [torch.device(f"cuda:{index:d}") for index in range(num_gpus)]
+    indices = list(range(num_gpus))
+
+    # with PYANNOTE_DEVICE_BALANCE=1, GPUs with more free memory come first
+    if os.getenv("PYANNOTE_DEVICE_BALANCE", "0") == "1":
+        free_memory = {index: torch.cuda.mem_get_info(index)[0] for index in indices}
+        indices = sorted(indices, key=lambda index: free_memory[index], reverse=True)
+
+    devices = [torch.device(f"cuda:{index:d}") for index in indices]
     if needs is None:
         return devices
     return [device for _, device in zip(range(needs), itertools.cycle(devices))]
@@ -199,18 +199,13 @@ class VoiceActivityDetection(Pipeline):
 
         # apply segmentation model (only if needed)
         # output shape is (num_chunks, num_frames, 1)
-        if self.training:
-            if self.CACHED_SEGMENTATION in file:
-                segmentations = file[self.CACHED_SEGMENTATION]
-            else:
-                segmentations = self._segmentation(
-                    file, hook=partial(hook, "segmentation", None)
-                )
-                file[self.CACHED_SEGMENTATION] = segmentations
-        else:
-            segmentations: SlidingWindowFeature = self._segmentation(
+        segmentations: SlidingWindowFeature = self._cached_forward(
+            self.CACHED_SEGMENTATION,
+            file,
+            lambda: self._segmentation(
                 file, hook=partial(hook, "segmentation", None)
-            )
+            ),
+        )
 
         hook("segmentation", segmentations)
 
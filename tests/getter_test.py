@@ -0,0 +1,174 @@
+import os
+
+import pytest
+import torch
+
+from pyannote.audio.pipelines.utils import clear_model_cache, get_devices, get_model
+from pyannote.audio.pipelines.utils import getter
+
+requires_mmap = pytest.mark.skipif(
+    not getter._TORCH_LOAD_MMAP,
+    reason="torch.load does not support `mmap` and `weights_only`",
+)
+
+
+@pytest.fixture()
+def load_calls(monkeypatch):
+    "Keyword arguments of successful torch.load calls"
+    calls = []
+    torch_load = torch.load
+
+    def recording_torch_load(*args, **kwargs):
+        output = torch_load(*args, **kwargs)
+        calls.append(kwargs)
+        return output
+
+    monkeypatch.setattr(torch, "load", recording_torch_load)
+    return calls
+
+
+@requires_mmap
+def test_torch_load_state_dict(tmp_path, load_calls):
+    "Bare state dicts are memory-mapped and loaded with weights_only=True"
+    state_dict = torch.nn.Linear(2, 2).state_dict()
+    path = tmp_path / "state_dict.pth"
+    torch.save(state_dict, path)
+
+    loaded = getter._torch_load(str(path))
+
+    assert torch.equal(loaded["weight"], state_dict["weight"])
+    assert load_calls[-1]["mmap"] and load_calls[-1]["weights_only"]
+
+
+@requires_mmap
+def test_torch_load_legacy_format(tmp_path, load_calls):
+    "Legacy (non-zip) checkpoints are loaded without mmap"
+    state_dict = torch.nn.Linear(2, 2).state_dict()
+    path = tmp_path / "legacy.pth"
+    torch.save(state_dict, path, _use_new_zipfile_serialization=False)
+
+    loaded = getter._torch_load(str(path))
+
+    assert torch.equal(loaded["weight"], state_dict["weight"])
+    assert not load_calls[-1]["mmap"] and load_calls[-1]["weights_only"]
+
+
+@requires_mmap
+def test_torch_load_pickled_model(tmp_path, load_calls):
+    "Whole pickled models are loaded with weights_only=False"
+    path = tmp_path / "model.pth"
+    torch.save(torch.nn.Linear(2, 2), path)
+
+    loaded = getter._torch_load(str(path))
+
+    assert isinstance(loaded, torch.nn.Linear)
+    assert not load_calls[-1]["weights_only"]
+
+
+def test_get_model_eval(tmp_path):
+    path = tmp_path / "model.pth"
+    torch.save(torch.nn.Linear(2, 2), path)
+    assert not get_model(str(path)).training
+
+
+@pytest.fixture()
+def checkpoint(tmp_path):
+    path = tmp_path / "model.pth"
+    torch.save(torch.nn.Linear(2, 2), path)
+    clear_model_cache()
+    yield str(path)
+    clear_model_cache()
+
+
+@pytest.fixture()
+def num_loads(monkeypatch):
+    calls = []
+    torch_load = getter._torch_load
+
+    def counting_torch_load(path):
+        calls.append(path)
+        return torch_load(path)
+
+    monkeypatch.setattr(getter, "_torch_load", counting_torch_load)
+    return calls
+
+
+def test_get_model_is_memoized(checkpoint, num_loads):
+    "Checkpoint is loaded once but each caller gets its own model"
+    model1 = get_model(checkpoint)
+    model2 = get_model({"checkpoint": checkpoint})
+    assert len(num_loads) == 1
+    assert model1 is not model2
+    assert torch.equal(model1.weight, model2.weight)
+
+
+def test_memoized_state_dict_shares_tensors(tmp_path, num_loads):
+    "Cached state dicts are copied without copying their tensors"
+    path = tmp_path / "state_dict.pth"
+    torch.save(torch.nn.Linear(2, 2).state_dict(), path)
+    clear_model_cache()
+    state_dict1 = get_model(str(path))
+    state_dict2 = get_model(str(path))
+    assert len(num_loads) == 1
+    assert state_dict1 is not state_dict2
+    assert state_dict1["weight"] is state_dict2["weight"]
+    clear_model_cache()
+
+
+def test_clear_model_cache(checkpoint, num_loads):
+    get_model(checkpoint)
+    clear_model_cache()
+    get_model(checkpoint)
+    assert len(num_loads) == 2
+
+
+def test_modified_checkpoint_replaces_cache_entry(checkpoint, num_loads):
+    get_model(checkpoint)
+    mtime = os.path.getmtime(checkpoint)
+    os.utime(checkpoint, (mtime + 10, mtime + 10))
+    get_model(checkpoint)
+    assert len(num_loads) == 2
+    assert len(getter._MODEL_CACHE) == 1
+
+
+def test_model_cache_is_bounded(tmp_path, num_loads, monkeypatch):
+    "Least recently used checkpoints are evicted"
+    monkeypatch.setattr(getter, "_MODEL_CACHE_MAXSIZE", 2)
+    clear_model_cache()
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"model{i}.pth"
+        torch.save(torch.nn.Linear(2, 2), path)
+        paths.append(str(path))
+
+    get_model(paths[0])
+    get_model(paths[1])
+    get_model(paths[0])
+    get_model(paths[2])
+
+    assert len(getter._MODEL_CACHE) == 2
+    assert os.path.realpath(paths[1]) not in getter._MODEL_CACHE
+    assert os.path.realpath(paths[0]) in getter._MODEL_CACHE
+    clear_model_cache()
+
+
+@pytest.fixture()
+def three_gpus(monkeypatch):
+    free_memory = [1, 5, 3]
+    monkeypatch.setattr(torch.cuda, "device_count", lambda: 3)
+    monkeypatch.setattr(
+        torch.cuda, "mem_get_info", lambda index: (free_memory[index], 10)
+    )
+
+
+def test_get_devices_by_index(three_gpus, monkeypatch):
+    monkeypatch.delenv("PYANNOTE_DEVICE_BALANCE", raising=False)
+    devices = get_devices(needs=4)
+    assert [device.index for device in devices] == [0, 1, 2, 0]
+
+
+def test_get_devices_by_free_memory(three_gpus, monkeypatch):
+    monkeypatch.setenv("PYANNOTE_DEVICE_BALANCE", "1")
+    devices = get_devices(needs=4)
+    assert [device.index for device in devices] == [1, 2, 0, 1]
+    assert [device.index for device in get_devices()] == [1, 2, 0]
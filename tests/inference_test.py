@@ -1,6 +1,7 @@
 import numpy as np
 import pytest
 import pytorch_lightning as pl
+import torch
 from pyannote.core import SlidingWindowFeature
 from pyannote.database import FileFinder, get_protocol
 
@@ -94,3 +95,18 @@ def test_skip_aggregation(pretrained_model, dev_file):
     inference = Inference(pretrained_model, skip_aggregation=True)
     scores = inference(dev_file)
     assert len(scores.data.shape) == 3
+
+
+def test_infer_with_device_name(trained, monkeypatch):
+    protocol, model = trained
+    inference = Inference(model, device="cpu", batch_size=128)
+    assert inference.device == torch.device("cpu")
+
+    def pin_memory(self):
+        raise AssertionError("chunks should not be pinned for CPU inference")
+
+    monkeypatch.setattr(torch.Tensor, "pin_memory", pin_memory)
+    chunks = model.example_input_array.repeat(2, 1, 1)
+    outputs = inference.infer(chunks)
+    assert isinstance(outputs, np.ndarray)
+    assert len(outputs) == 2
@@ -0,0 +1,231 @@
+import io
+import os
+import shutil
+
+import pytest
+import torch
+import torchaudio
+from pyannote.database import FileFinder
+from pyannote.pipeline.parameter import Uniform
+
+from pyannote.audio import Audio, Pipeline
+from pyannote.audio.core.pipeline import _load_config, _load_preprocessor
+
+TEST_FILES = ["tests/data/dev00.wav", "tests/data/dev01.wav", "tests/data/trn01.wav"]
+
+
+class EchoPipeline(Pipeline):
+    "Returns waveform as seen by models (i.e. after channel selection)"
+
+    def apply(self, file):
+        waveform, sample_rate = Audio(mono="downmix")(file)
+        return file["uri"], waveform, sample_rate
+
+
+class CachingPipeline(EchoPipeline):
+    CACHED_SEGMENTATION = "cache/segmentation"
+
+    def __init__(self):
+        super().__init__()
+        self.preloaded = []
+
+    def apply(self, file):
+        self.preloaded.append("waveform" in file)
+        return self._cached_forward(
+            self.CACHED_SEGMENTATION,
+            file,
+            lambda: super(CachingPipeline, self).apply(file),
+        )
+
+
+class ThresholdPipeline(Pipeline):
+    def __init__(self):
+        super().__init__()
+        self.threshold = Uniform(0.0, 1.0)
+
+
+class CustomLoadPipeline(ThresholdPipeline):
+    def load_params(self, params_yml):
+        self.params_yml = params_yml
+        return super().load_params(params_yml)
+
+
+@pytest.fixture()
+def pipeline():
+    return EchoPipeline()
+
+
+@pytest.fixture()
+def stereo_file(tmp_path):
+    waveform = torch.rand(2, 16000) - 0.5
+    path = tmp_path / "stereo.wav"
+    torchaudio.save(str(path), waveform, 16000)
+    return str(path)
+
+
+def test_config_cache(tmp_path, monkeypatch):
+    "Parsed config is reused from JSON sidecar when it is up to date"
+    monkeypatch.setenv("PYANNOTE_CONFIG_CACHE", "1")
+    config_yml = tmp_path / "config.yaml"
+    config_yml.write_text("pipeline:\n  name: EchoPipeline\n")
+    cache = tmp_path / "config.yaml.cache.json"
+
+    config = _load_config(str(config_yml))
+    assert cache.is_file()
+    assert _load_config(str(config_yml)) == config
+
+    # sidecar content is used as long as it is not older than config
+    cache.write_text('{"pipeline": {"name": "Cached"}}')
+    assert _load_config(str(config_yml)) == {"pipeline": {"name": "Cached"}}
+
+    # stale sidecar is ignored and rewritten
+    mtime = os.path.getmtime(config_yml)
+    os.utime(cache, (mtime - 10, mtime - 10))
+    assert _load_config(str(config_yml)) == config
+    assert _load_config(str(config_yml)) == config
+
+
+def test_config_cache_skips_lossy_json(tmp_path, monkeypatch):
+    "No sidecar is written when JSON cannot represent config exactly"
+    monkeypatch.setenv("PYANNOTE_CONFIG_CACHE", "1")
+    config_yml = tmp_path / "config.yaml"
+    config_yml.write_text("params:\n  1: a\n")
+    assert _load_config(str(config_yml)) == {"params": {1: "a"}}
+    assert not (tmp_path / "config.yaml.cache.json").exists()
+
+
+def test_config_cache_disabled(tmp_path, monkeypatch):
+    monkeypatch.delenv("PYANNOTE_CONFIG_CACHE", raising=False)
+    config_yml = tmp_path / "config.yaml"
+    config_yml.write_text("pipeline:\n  name: EchoPipeline\n")
+    _load_config(str(config_yml))
+    assert not (tmp_path / "config.yaml.cache.json").exists()
+
+
+def test_call_does_not_modify_input(pipeline):
+    "Preloading does not store waveform in caller's dictionary"
+    file = {"audio": TEST_FILES[0], "uri": "dev00", "channel": 0}
+    pipeline(file)
+    assert file == {"audio": TEST_FILES[0], "uri": "dev00", "channel": 0}
+
+
+def test_preload_keeps_channel_selection(pipeline, stereo_file):
+    _, waveform, _ = pipeline({"audio": stereo_file, "channel": 1}, preload=True)
+    _, expected, _ = pipeline({"audio": stereo_file, "channel": 1}, preload=False)
+    assert waveform.shape == (1, 16000)
+    assert torch.allclose(waveform, expected)
+
+
+def test_preload_in_training_mode(stereo_file):
+    "Waveform is not kept on caller's file nor decoded once outputs are cached"
+    pipeline = CachingPipeline()
+    pipeline.training = True
+    file = {"audio": stereo_file, "uri": "stereo", "channel": 1}
+
+    first = pipeline(file)
+    second = pipeline(file)
+
+    assert pipeline.preloaded == [True, False]
+    assert file["channel"] == 1
+    assert "waveform" not in file and "sample_rate" not in file
+    assert pipeline.CACHED_SEGMENTATION in file
+    assert first is second
+
+
+def test_call_with_bytes(pipeline):
+    "Raw bytes are decoded like the file they come from"
+    with open(TEST_FILES[0], "rb") as fp:
+        data = fp.read()
+    _, waveform, sample_rate = pipeline(data)
+    _, expected, expected_sample_rate = pipeline(TEST_FILES[0])
+    assert torch.equal(waveform, expected)
+    assert sample_rate == expected_sample_rate
+
+
+def test_call_with_unrewound_bytesio(pipeline):
+    "File-like objects are rewound before being decoded"
+    with open(TEST_FILES[0], "rb") as fp:
+        data = io.BytesIO(fp.read())
+    data.seek(0, io.SEEK_END)
+    uri, waveform, _ = pipeline(data)
+    expected, _ = Audio(mono="downmix")(TEST_FILES[0])
+    assert uri == "stream"
+    assert torch.equal(waveform, expected)
+
+
+def test_load_preprocessor_template():
+    assert _load_preprocessor(("audio", "/path/to/{uri}.wav")) == (
+        "audio",
+        "/path/to/{uri}.wav",
+    )
+
+
+def test_load_preprocessor_database_yml():
+    key, preprocessor = _load_preprocessor(("audio", "tests/data/database.yml"))
+    assert key == "audio"
+    assert isinstance(preprocessor, FileFinder)
+
+
+def test_load_preprocessor_database_yml_in_home(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    (tmp_path / "db").mkdir()
+    shutil.copy("tests/data/database.yml", tmp_path / "db" / "database.yml")
+    _, preprocessor = _load_preprocessor(("audio", "~/db/database.yml"))
+    assert isinstance(preprocessor, FileFinder)
+
+
+def test_load_preprocessor_null():
+    _, preprocessor = _load_preprocessor(("audio", None))
+    assert isinstance(preprocessor, FileFinder)
+
+
+def test_apply_batch_order(pipeline):
+    "Outputs are yielded in input order"
+    waveform = torch.rand(1, 16000)
+    with open(TEST_FILES[1], "rb") as fp:
+        data = fp.read()
+    files = TEST_FILES + [
+        {"waveform": waveform, "sample_rate": 16000, "uri": "random"},
+        data,
+    ]
+
+    outputs = list(pipeline.apply_batch(files, num_workers=0))
+
+    uris = [uri for uri, _, _ in outputs]
+    assert uris == ["dev00", "dev01", "trn01", "random", "stream"]
+    for file, (_, waveform, _) in zip(TEST_FILES, outputs):
+        expected, _ = Audio(mono="downmix")(file)
+        assert torch.equal(waveform, expected)
+    assert torch.equal(outputs[3][1], files[3]["waveform"])
+
+
+def write_config(tmp_path, klass):
+    config_yml = tmp_path / "config.yaml"
+    name = f"{klass.__module__}.{klass.__name__}"
+    config_yml.write_text(f"pipeline:\n  name: {name}\n")
+    return config_yml
+
+
+def test_from_pretrained_with_hparams_file(tmp_path):
+    "Hyper-parameters dumped with `dump_params` are loaded back"
+    params_yml = tmp_path / "params.yaml"
+    ThresholdPipeline().instantiate({"threshold": 0.3}).dump_params(params_yml)
+
+    pipeline = Pipeline.from_pretrained(
+        write_config(tmp_path, ThresholdPipeline), hparams_file=params_yml
+    )
+    assert isinstance(pipeline, ThresholdPipeline)
+    assert pipeline.parameters(instantiated=True) == {"threshold": 0.3}
+
+
+def test_from_pretrained_with_custom_load_params(tmp_path):
+    "Pipelines overriding `load_params` still receive the hyper-parameters file"
+    params_yml = tmp_path / "params.yaml"
+    ThresholdPipeline().instantiate({"threshold": 0.7}).dump_params(params_yml)
+
+    pipeline = Pipeline.from_pretrained(
+        write_config(tmp_path, CustomLoadPipeline), hparams_file=params_yml
+    )
+    assert isinstance(pipeline, CustomLoadPipeline)
+    assert pipeline.params_yml == params_yml
+    assert pipeline.threshold == 0.7